@@ -2,6 +2,7 @@ import logging
 
 from icons_asset_generator.arguments import create_arg_parser
 from icons_asset_generator.common.invalid_argument import InvalidArgument
+from icons_asset_generator.common.manifest import has_changes
 from icons_asset_generator.diagramsnet.diagramsnet import DiagramsNet
 from icons_asset_generator.omnigraffle.omnigraffle import OmniGraffle
 from icons_asset_generator.util.logger import setup_logging, get_logger
@@ -21,6 +22,9 @@ def main():
 
     try:
         processor = args.pop('processor')(**args)
+        if args.get('plan'):
+            changes = processor.plan()
+            exit(3 if has_changes(changes) else 0)
         processor.process()
     except InvalidArgument as e:
         parser.print_usage()
@@ -27,6 +27,9 @@ def create_arg_parser(processors: List) -> ArgumentParser:
                         help='number of connection points for each side (default: 5)')
     parser.add_argument('--labels', action='store_true', dest='labels',
                         help='add text labels with name to icons')
+    parser.add_argument('--plan', action='store_true',
+                        help='only report images added, changed and removed since the previous build, '
+                             'without building anything')
     parser.add_argument('-v', action='store_true', help='enable verbose logs')
 
     subparsers = parser.add_subparsers(title='target format', metavar='TARGET', required=True)
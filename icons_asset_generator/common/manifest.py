@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Any, Optional
+
+from icons_asset_generator.util.cache import hash_cache
+from icons_asset_generator.util.io import file_key
+
+manifest_file_name = 'manifest.json'
+
+
+def hash_file(file_path: str) -> str:
+    cache_key = file_key(file_path)
+
+    digest = hash_cache.get(cache_key)
+    if digest is None:
+        with open(file_path, 'rb') as fp:
+            digest = hashlib.sha256(fp.read()).hexdigest()
+        hash_cache.put(cache_key, digest)
+
+    return digest
+
+
+def create_manifest_entry(base_path: str, image: str, group: str, artifact: str, encoded_size: int) -> Dict[str, Any]:
+    stat = os.stat(image)
+    return {
+        'source': os.path.relpath(image, base_path),
+        'hash': hash_file(image),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'group': group,
+        'artifact': artifact,
+        'encoded_size': encoded_size,
+    }
+
+
+def save_manifest(output_dir: str, target: str, options: Dict[str, Any], entries: List[Dict[str, Any]]) -> str:
+    manifest_file = os.path.join(output_dir, manifest_file_name)
+    with open(manifest_file, 'w') as fp:
+        json.dump({
+            'target': target,
+            'options': options,
+            'icons': entries,
+        }, fp, indent=2)
+    return manifest_file
+
+
+def load_manifest(output_dir: str) -> Optional[Dict[str, Any]]:
+    manifest_file = os.path.join(output_dir, manifest_file_name)
+    if not os.path.isfile(manifest_file):
+        return None
+
+    with open(manifest_file) as fp:
+        return json.load(fp)
+
+
+def plan_changes(manifest: Optional[Dict[str, Any]], target: str, options: Dict[str, Any],
+                 base_path: str, image_groups: Dict[str, List[str]]) -> Dict[str, Any]:
+    """
+    Compares images with the manifest from the previous build without processing them.
+    Images are hashed only if their modification time or size changed.
+    Output size of added and changed images is estimated from the average
+    encoded to source size ratio of the previous build.
+    :return: Lists of added, changed and removed images source paths and estimated output size in bytes
+    """
+    previous_icons = {icon['source']: icon for icon in manifest['icons']} if manifest else {}
+    options_changed = manifest is not None and (manifest['target'] != target or manifest['options'] != options)
+
+    source_size = sum(icon['size'] for icon in previous_icons.values())
+    encoded_size = sum(icon['encoded_size'] for icon in previous_icons.values())
+    size_ratio = encoded_size / source_size if source_size else 1
+
+    added, changed = [], []
+    unchanged = 0
+    estimated_size = 0
+
+    for group, images in image_groups.items():
+        for image in images:
+            source = os.path.relpath(image, base_path)
+            stat = os.stat(image)
+            previous = previous_icons.pop(source, None)
+
+            if previous is None:
+                added.append(source)
+            elif options_changed or previous['group'] != group or not _is_same_file(image, stat, previous):
+                changed.append(source)
+            else:
+                unchanged += 1
+                estimated_size += previous['encoded_size']
+                continue
+
+            estimated_size += round(stat.st_size * size_ratio)
+
+    return {
+        'added': added,
+        'changed': changed,
+        'removed': sorted(previous_icons.keys()),
+        'unchanged': unchanged,
+        'options_changed': options_changed,
+        'estimated_size': estimated_size,
+    }
+
+
+def has_changes(changes: Dict[str, Any]) -> bool:
+    return bool(changes['added'] or changes['changed'] or changes['removed'] or changes['options_changed'])
+
+
+def _is_same_file(image: str, stat: os.stat_result, previous: Dict[str, Any]) -> bool:
+    if stat.st_mtime_ns == previous['mtime_ns'] and stat.st_size == previous['size']:
+        return True
+
+    return stat.st_size == previous['size'] and hash_file(image) == previous['hash']
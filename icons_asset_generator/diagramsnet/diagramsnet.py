@@ -10,7 +10,9 @@ from icons_asset_generator.common.magnets import create_magnets
 from icons_asset_generator.common.name import create_name
 from icons_asset_generator.common.size import get_svg_size, calc_new_size
 from icons_asset_generator.processor import Processor, ProcessorConfig
+from icons_asset_generator.util.cache import render_cache
 from icons_asset_generator.util.encoding import text_to_base64, deflate_raw
+from icons_asset_generator.util.io import file_key
 from icons_asset_generator.util.logger import get_logger
 
 logger = get_logger(__name__)
@@ -61,8 +63,14 @@ class DiagramsNet(Processor):
     def process(self):
         logger.info('Creating Diagrams.net library')
 
+        self._library = []
+
         super().process()
 
+    def _process_groups(self):
+        super()._process_groups()
+
+        # before the manifest is saved, to not list library which failed to be written
         self._write_library()
 
     def process_group(self, library_name: str, library_images: List[str]):
@@ -71,13 +79,24 @@ class DiagramsNet(Processor):
         for image in library_images:
             logger.debug(f'Processing file {image}')
 
+            title = create_name(os.path.splitext(os.path.basename(image))[0], self._conf.image_name_remove)
+
+            params = self._get_image_params(image, title)
+            self._library.append(params)
+            self._add_to_manifest(image, library_name, self._library_file_name(), len(params['xml']))
+
+    def _get_image_params(self, image: str, title: str) -> dict:
+        cache_key = ('diagrams.net', file_key(image), title,
+                     self._conf.vertex_magnets, self._conf.side_magnets, self._conf.labels, self._conf.size)
+
+        params = render_cache.get(cache_key)
+        if params is None:
             with open(image) as file:
                 svg = file.read()
-            title = create_name(os.path.splitext(os.path.basename(image))[0], self._conf.image_name_remove)
+            params = self._create_image_params(svg, title)
+            render_cache.put(cache_key, params)
 
-            self._library.append(
-                self._create_image_params(svg, title)
-            )
+        return params
 
     def _create_image_params(self, svg: str, title: str) -> dict:
         points = create_magnets(self._conf.vertex_magnets, self._conf.side_magnets)
@@ -159,11 +178,14 @@ class DiagramsNet(Processor):
         library.text = data
         return ET.tostring(library, encoding='unicode', method='xml')
 
+    def _library_file_name(self) -> str:
+        return f'{self._library_name}.xml'
+
     def _write_library(self):
         library_json = json.dumps(self._library)
         library_xml = self._create_library_xml(library_json)
 
-        library_file = os.path.join(self._conf.output, f'{self._library_name}.xml')
+        library_file = os.path.join(self._conf.output, self._library_file_name())
         with open(library_file, 'w') as file:
             file.write(library_xml)
         logger.info(f'Created {library_file}')
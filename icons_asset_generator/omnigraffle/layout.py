@@ -0,0 +1,34 @@
+from typing import Tuple
+
+
+class SheetLayout:
+    """
+    Places images on the sheet in rows of given number of columns, left to right.
+    Each row starts below the highest image of the previous row.
+    """
+
+    def __init__(self, columns: int, spacing: int):
+        self._columns = columns
+        self._spacing = spacing
+
+        self._column = 0
+        self._x = 0
+        self._y = 0
+        self._row_height = 0
+
+    def next_bounds(self, size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        width, height = size
+
+        if self._column == self._columns:
+            self._column = 0
+            self._x = 0
+            self._y = self._y + self._row_height + self._spacing
+            self._row_height = 0
+
+        bounds = (self._x, self._y, width, height)
+
+        self._column += 1
+        self._x = self._x + width + self._spacing
+        self._row_height = max(self._row_height, height)
+
+        return bounds
@@ -1,13 +1,23 @@
+import copy
+import math
 import os
 import plistlib
+import tempfile
 from argparse import ArgumentParser
-from typing import List, Dict, Any, Tuple
+from functools import lru_cache
+from io import BytesIO
+from typing import List, Dict, Any, Tuple, Callable, BinaryIO
 
 import cairosvg
 from PyPDF2 import PdfFileReader
 
+from icons_asset_generator.common.invalid_argument import InvalidArgument
 from icons_asset_generator.common.name import create_name
+from icons_asset_generator.omnigraffle.layout import SheetLayout
+from icons_asset_generator.omnigraffle.plist_writer import PlistDictTemplate, PlistWriter, create_plist_writer
 from icons_asset_generator.processor import Processor, ProcessorConfig
+from icons_asset_generator.util.cache import render_cache
+from icons_asset_generator.util.io import file_key
 from icons_asset_generator.util.logger import get_logger
 
 logger = get_logger(__name__)
@@ -17,16 +27,40 @@ data_template_file = os.path.join(templates_dir, 'data.plist')
 sheet_template_file = os.path.join(templates_dir, 'sheet.plist')
 image_template_file = os.path.join(templates_dir, 'image.plist')
 
+label_rtf_prefix = '{\\rtf1\\ansi\\ansicpg1252\\cocoartf2580\\cocoatextscaling0\\cocoaplatform0' \
+                   '{\\fonttbl\\f0\\fnil\\fcharset0 HelveticaNeue;}' \
+                   '{\\colortbl;\\red255\\green255\\blue255;\\red0\\green0\\blue0;}' \
+                   '{\\*\\expandedcolortbl;;\\cssrgb\\c0\\c0\\c0;}' \
+                   '\\paperw11900\\paperh16840\\vieww12000\\viewh15840\\viewkind0' \
+                   '\\pard\\tx720\\tx1440\\tx2160\\tx2880\\tx3600\\tx4320\\tx5040\\tx5760\\tx6480\\tx7200' \
+                   '\\tx7920\\tx8640\\pardirnatural\\qc\\partightenfactor0\\f0\\fs24 \\cf2 '
+
+
+def load_templates() -> None:
+    for template_file in [data_template_file, sheet_template_file, image_template_file]:
+        _read_plist(template_file)
+
+
+@lru_cache(maxsize=None)
+def _read_plist(file_path: str) -> Dict[str, Any]:
+    with open(file_path, 'rb') as fp:
+        return plistlib.load(fp)
+
 
 class OmniGraffleConfig(ProcessorConfig):
     text_output: bool = None
+    columns: int = None
+    spacing: int = None
+    max_sheet_icons: int = None
 
 
 class OmniGraffle(Processor):
     _conf: OmniGraffleConfig = None
 
-    _data_pl = None
-    _image_pl_tpl = None
+    _data_writer: PlistWriter = None
+    _data_pl_tpl: PlistDictTemplate = None
+    _sheet_pl_tpl: PlistDictTemplate = None
+    _image_pl_tpl: PlistDictTemplate = None
     _stencil_path = None
     _image_idx = 0
 
@@ -36,114 +70,180 @@ class OmniGraffle(Processor):
 
         parser.add_argument('--text-output', action='store_true',
                             help='write OmniGraffle data file as text instead of binary')
+        parser.add_argument('--columns', metavar='COUNT', default=5, type=int,
+                            help='number of images in a row on the sheet (default: 5)')
+        parser.add_argument('--spacing', metavar='VALUE', default=50, type=int,
+                            help='space between images on the sheet (default: 50)')
+        parser.add_argument('--max-sheet-icons', metavar='COUNT', default=0, type=int,
+                            help='split groups into multiple sheets with at most COUNT images each '
+                                 '(default: 0, no limit)')
 
         return parser
 
+    @staticmethod
+    def _create_config(config: Dict[str, Any]) -> OmniGraffleConfig:
+        return OmniGraffleConfig(config)
+
+    def _validate_config(self):
+        super()._validate_config()
+
+        if self._conf.columns < 1:
+            raise InvalidArgument('Columns count must be at least 1')
+        if self._conf.spacing < 0:
+            raise InvalidArgument('Spacing must not be negative')
+        if self._conf.max_sheet_icons < 0:
+            raise InvalidArgument('Max sheet icons count must not be negative')
+
     def process(self):
         logger.info('Creating OmniGraffle stencil')
 
-        self._data_pl = self._create_data_plist()
-        self._image_pl_tpl = self._load_image_plist_template()
-
         self._stencil_path = os.path.join(self._conf.output, f'{self._library_name}.gstencil')
 
         super().process()
 
-        self._save_data_plist()
-
         logger.info(f'Created {self._stencil_path}')
 
-    def _create_data_plist(self) -> Dict[str, Any]:
-        return self._load_plist(data_template_file)
-
-    def _load_image_plist_template(self) -> Dict[str, Any]:
-        return self._load_plist(image_template_file)
-
     def _create_dirs(self):
         super()._create_dirs()
         os.mkdir(self._stencil_path)
 
+    def _process_groups(self):
+        # written to a temporary file first, to not leave incomplete data file if processing fails
+        data_file = os.path.join(self._stencil_path, 'data.plist')
+        fd, tmp_data_file = tempfile.mkstemp(dir=self._stencil_path, prefix='data.plist.')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                self._write_data_plist(fp)
+            os.replace(tmp_data_file, data_file)
+        except BaseException:
+            os.remove(tmp_data_file)
+            raise
+
+    def _write_data_plist(self, fp: BinaryIO) -> None:
+        fmt = plistlib.FMT_XML if self._conf.text_output else plistlib.FMT_BINARY
+        self._data_writer = create_plist_writer(fp, fmt)
+
+        data_pl = self._load_plist(data_template_file)
+        self._create_plist_templates(data_pl)
+        process_groups = super()._process_groups
+
+        # ImageList is written in the same dict as Sheets, possibly before images are processed,
+        # so it's created from image indexes the images will get: sequential, starting from the current one
+        first_image_idx = self._image_idx + 1
+        images_count = sum(len(images) for images in self._libraries.values())
+
+        self._data_pl_tpl.write({
+            'ImageCounter': data_pl['ImageCounter'] + images_count,
+            'ImageList': lambda: self._write_image_list(data_pl['ImageList'], first_image_idx, images_count),
+            'Sheets': lambda: self._write_array(process_groups),
+        })
+
+        if self._image_idx != first_image_idx + images_count - 1:
+            raise Exception(f'Processed images indexes {first_image_idx}-{self._image_idx} '
+                            f'do not match ImageList with {images_count} images')
+
+        self._data_writer.close()
+
+    def _create_plist_templates(self, data_pl: Dict[str, Any]) -> None:
+        self._data_pl_tpl = PlistDictTemplate(self._data_writer, data_pl, ['ImageCounter', 'ImageList', 'Sheets'])
+
+        sheet_pl = self._load_plist(sheet_template_file)
+        self._sheet_pl_tpl = PlistDictTemplate(self._data_writer, sheet_pl, ['SheetTitle', 'GraphicsList'])
+
+        image_pl = self._load_plist(image_template_file)
+        image_pl['Magnets'] = self._create_magnets()
+        if self._conf.labels:
+            image_pl['Wrap'] = 'NO'
+            image_pl['TextRelativeArea'] = '{{0, 0.66}, {1, 1}}'
+        image_variable_keys = ['Bounds', 'ID', 'ImageID', 'Name'] + (['Text'] if self._conf.labels else [])
+        self._image_pl_tpl = PlistDictTemplate(self._data_writer, image_pl, image_variable_keys)
+
+    def _write_image_list(self, template_image_list: List[str], first_image_idx: int, images_count: int) -> None:
+        def write_items():
+            for image in template_image_list:
+                self._data_writer.value(image)
+            for idx in range(first_image_idx, first_image_idx + images_count):
+                self._data_writer.value(f'image{idx}.pdf')
+
+        self._write_array(write_items)
+
+    def _write_array(self, write_items: Callable[[], None]) -> None:
+        self._data_writer.start_array()
+        write_items()
+        self._data_writer.end_array()
+
     def process_group(self, library_name: str, library_images: List[str]):
         super().process_group(library_name, library_images)
 
-        sheet_pl = self._create_sheet_plist(library_name)
-        sheet_image_bounds = []
+        sheet_size = self._conf.max_sheet_icons or len(library_images)
+        sheets_count = math.ceil(len(library_images) / sheet_size)
+
+        for sheet_idx in range(sheets_count):
+            sheet_title = library_name if sheets_count == 1 else f'{library_name} {sheet_idx + 1}'
+            sheet_images = library_images[sheet_idx * sheet_size:(sheet_idx + 1) * sheet_size]
+            self._sheet_pl_tpl.write({
+                'SheetTitle': sheet_title,
+                'GraphicsList': lambda: self._write_array(
+                    lambda: self._process_sheet_images(library_name, sheet_images)
+                ),
+            })
 
-        for image in library_images:
+    def _process_sheet_images(self, library_name: str, sheet_images: List[str]):
+        layout = SheetLayout(self._conf.columns, self._conf.spacing)
+
+        for image in sheet_images:
             logger.debug(f'Processing file {image}')
 
             self._image_idx += 1
-            pdf_image_path = self._save_image_as_pdf(image)
+            pdf, size = self._render_image(image)
+            pdf_image_path = self._save_image_as_pdf(pdf)
+            self._add_to_manifest(image, library_name, os.path.relpath(pdf_image_path, self._conf.output), len(pdf))
             stencil_name = create_name(image, self._conf.image_name_remove)
-            sheet_image_bounds.append(self._calc_next_image_bounds(pdf_image_path, sheet_image_bounds))
-            image_pl = self._create_image_plist(stencil_name, sheet_image_bounds[-1])
-            self._add_image_to_sheet(sheet_pl, image_pl)
-
-        self._add_sheet_to_data(sheet_pl)
-
-    def _create_sheet_plist(self, sheet_title: str) -> Dict[str, Any]:
-        sheet_pl = self._load_plist(sheet_template_file)
-        sheet_pl['SheetTitle'] = sheet_title
-        return sheet_pl
-
-    def _save_image_as_pdf(self, source: str) -> str:
-        pdf_path = os.path.join(self._stencil_path, f'image{self._image_idx}.pdf')
-        cairosvg.svg2pdf(url=source, write_to=pdf_path, dpi=72)
-        return pdf_path
+            self._write_image_plist(stencil_name, layout.next_bounds(size))
 
     @staticmethod
-    def _calc_next_image_bounds(pdf_image_path: str, sheet_image_bounds: List[Tuple[int, int, int, int]]) -> Tuple[int, int, int, int]:
-        with open(pdf_image_path, 'rb') as fp:
-            input1 = PdfFileReader(fp)
-            media_box = input1.getPage(0).mediaBox
-
-        _, _, width, height = media_box
-        space_between = 50
+    def _render_image(source: str) -> Tuple[bytes, Tuple[int, int]]:
+        cache_key = ('omnigraffle', file_key(source))
 
-        if len(sheet_image_bounds) == 0:
-            x = 0
-            y = 0
-        elif len(sheet_image_bounds) > 1 and (len(sheet_image_bounds)) % 5 == 0:
-            last_line_bounds = sheet_image_bounds[-5:]
-            _, prev_y, _, _ = last_line_bounds[0]
+        rendered = render_cache.get(cache_key)
+        if rendered is None:
+            pdf = cairosvg.svg2pdf(url=source, dpi=72)
+            media_box = PdfFileReader(BytesIO(pdf)).getPage(0).mediaBox
+            _, _, width, height = media_box
 
-            max_last_line_height = max(bounds[3] for bounds in last_line_bounds)
+            rendered = (pdf, (width, height))
+            render_cache.put(cache_key, rendered)
 
-            x = 0
-            y = prev_y + max_last_line_height + space_between
-        else:
-            prev_x, prev_y, prev_width, prev_height = sheet_image_bounds[-1]
-            x = prev_x + prev_width + space_between
-            y = prev_y
+        return rendered
 
-        return x, y, width, height
+    def _save_image_as_pdf(self, pdf: bytes) -> str:
+        pdf_path = os.path.join(self._stencil_path, f'image{self._image_idx}.pdf')
+        with open(pdf_path, 'wb') as fp:
+            fp.write(pdf)
+        return pdf_path
 
-    def _create_image_plist(self, stencil_name: str, bounds: Tuple[int, int, int, int]) -> Dict[str, Any]:
-        image_pl = self._image_pl_tpl.copy()
+    def _write_image_plist(self, stencil_name: str, bounds: Tuple[int, int, int, int]) -> None:
+        values = {
+            'Bounds': '{{%s, %s},{%s, %s}}' % bounds,
+            'ID': self._image_idx,
+            'ImageID': self._image_idx,
+            'Name': stencil_name,
+        }
+        if self._conf.labels:
+            values['Text'] = {
+                'Text': label_rtf_prefix + stencil_name + '}',
+                'TextAlongPathGlyphAnchor': 'center',
+            }
 
-        image_pl['Bounds'] = '{{' + str(bounds[0]) + ', ' + str(bounds[1]) + '},' + \
-                             '{' + str(bounds[2]) + ', ' + str(bounds[3]) + '}}'
-        image_pl['ID'] = self._image_idx
-        image_pl['ImageID'] = self._image_idx
-        image_pl['Name'] = stencil_name
+        self._image_pl_tpl.write(values)
 
+    def _create_magnets(self) -> List[str]:
         magnet_positions = []
         if self._conf.vertex_magnets:
             magnet_positions.extend(self._create_vertex_magnets())
         magnet_positions.extend(self._create_side_magnets())
 
-        magnets = ['{' + str(pos[0]) + ', ' + str(pos[1]) + '}' for pos in magnet_positions]
-        image_pl['Magnets'] = magnets
-
-        if self._conf.labels:
-            image_pl['Wrap'] = "NO"
-            image_pl['TextRelativeArea'] = "{{0, 0.66}, {1, 1}}"
-            image_pl['Text'] = {
-                "Text": "{\\rtf1\\ansi\\ansicpg1252\\cocoartf2580\\cocoatextscaling0\\cocoaplatform0{\\fonttbl\\f0\fnil\\fcharset0 HelveticaNeue;}{\\colortbl;\\red255\\green255\\blue255;\\red0\green0\\blue0;}{\\*\\expandedcolortbl;;\\cssrgb\\c0\\c0\\c0;}\\paperw11900\\paperh16840\\vieww12000\\viewh15840\\viewkind0\\pard\\tx720\\tx1440\\tx2160\\tx2880\\tx3600\\tx4320\\tx5040\\tx5760\\tx6480\\tx7200\\tx7920\\tx8640\\pardirnatural\\qc\\partightenfactor0\\f0\\fs24 \\cf2 " + stencil_name + "}",
-                "TextAlongPathGlyphAnchor": "center",
-            }
-
-        return image_pl
+        return ['{' + str(pos[0]) + ', ' + str(pos[1]) + '}' for pos in magnet_positions]
 
     @staticmethod
     def _create_vertex_magnets() -> List[Tuple[float, float]]:
@@ -169,26 +269,7 @@ class OmniGraffle(Processor):
 
         return magnets
 
-    @staticmethod
-    def _add_image_to_sheet(sheet_pl: Dict[str, Any], image_pl: Dict[str, Any]) -> None:
-        sheet_pl['GraphicsList'].append(image_pl)
-
-    def _add_sheet_to_data(self, sheet_pl: Dict[str, Any]) -> None:
-        images_count = len(sheet_pl['GraphicsList'])
-
-        self._data_pl['Sheets'].append(sheet_pl)
-
-        self._data_pl['ImageCounter'] += images_count
-        self._data_pl['ImageList'].extend([f'image{image["ID"]}.pdf' for image in sheet_pl['GraphicsList']])
-
     @staticmethod
     def _load_plist(file_path: str) -> Dict[str, Any]:
-        with open(file_path, 'rb') as fp:
-            return plistlib.load(fp)
-
-    def _save_data_plist(self) -> None:
-        data_file = os.path.join(self._stencil_path, 'data.plist')
-        with open(data_file, 'wb') as fp:
-            fmt = plistlib.FMT_XML if self._conf.text_output else plistlib.FMT_BINARY
-            # noinspection PyTypeChecker
-            plistlib.dump(self._data_pl, fp, fmt=fmt)
+        # copied, as parsed templates are cached for the whole process
+        return copy.deepcopy(_read_plist(file_path))
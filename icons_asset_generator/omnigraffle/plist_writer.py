@@ -0,0 +1,381 @@
+import plistlib
+import re
+import struct
+from abc import ABCMeta, abstractmethod
+from array import array
+from typing import Any, BinaryIO, Dict, List, Tuple, Union
+
+_control_chars = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class PlistWriter(metaclass=ABCMeta):
+    """
+    Writes plist incrementally, so containers with many entries don't have to be kept in memory.
+    Containers are opened with start_dict() or start_array() and closed with end_dict() or end_array(),
+    dict entries are written as key() followed by a value or a container.
+    Entries which are the same in many dicts can be serialized once with prepare() and written with items().
+    """
+
+    def __init__(self, fp: BinaryIO):
+        self._fp = fp
+
+    @abstractmethod
+    def start_dict(self) -> None:
+        pass
+
+    @abstractmethod
+    def end_dict(self) -> None:
+        pass
+
+    @abstractmethod
+    def start_array(self) -> None:
+        pass
+
+    @abstractmethod
+    def end_array(self) -> None:
+        pass
+
+    @abstractmethod
+    def key(self, name: str) -> None:
+        pass
+
+    @abstractmethod
+    def value(self, value: Any) -> None:
+        pass
+
+    @abstractmethod
+    def prepare(self, items: Dict[str, Any]) -> Any:
+        pass
+
+    @abstractmethod
+    def items(self, prepared: Any) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+
+class XmlPlistWriter(PlistWriter):
+    """
+    Writes XML plist formatted the same way as plistlib does.
+    """
+
+    def __init__(self, fp: BinaryIO):
+        super().__init__(fp)
+        self._depth = 0
+        self._pending_tag = None
+
+        self._fp.write(b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                       b'<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" '
+                       b'"http://www.apple.com/DTDs/PropertyList-1.0.dtd">\n'
+                       b'<plist version="1.0">\n')
+
+    def start_dict(self) -> None:
+        self._start('dict')
+
+    def end_dict(self) -> None:
+        self._end('dict')
+
+    def start_array(self) -> None:
+        self._start('array')
+
+    def end_array(self) -> None:
+        self._end('array')
+
+    def key(self, name: str) -> None:
+        self._open_pending()
+        lines = []
+        self._render_key(name, self._depth, lines)
+        self._write(lines)
+
+    def value(self, value: Any) -> None:
+        self._open_pending()
+        lines = []
+        self._render(value, self._depth, lines)
+        self._write(lines)
+
+    def prepare(self, items: Dict[str, Any]) -> '_PreparedXmlItems':
+        return _PreparedXmlItems(items)
+
+    def items(self, prepared: '_PreparedXmlItems') -> None:
+        self._open_pending()
+        # rendered once for each depth the items are written at
+        if self._depth not in prepared.rendered:
+            lines = []
+            for k, v in prepared.items.items():
+                self._render_key(k, self._depth, lines)
+                self._render(v, self._depth, lines)
+            prepared.rendered[self._depth] = ''.join(lines).encode('utf8')
+        self._fp.write(prepared.rendered[self._depth])
+
+    def close(self) -> None:
+        self._fp.write(b'</plist>\n')
+
+    def _start(self, tag: str) -> None:
+        # opening tag is written with the first element, to write empty containers as <tag/>
+        self._open_pending()
+        self._pending_tag = tag
+
+    def _open_pending(self) -> None:
+        if self._pending_tag:
+            self._write([self._line(f'<{self._pending_tag}>', self._depth)])
+            self._depth += 1
+            self._pending_tag = None
+
+    def _end(self, tag: str) -> None:
+        if self._pending_tag:
+            self._write([self._line(f'<{tag}/>', self._depth)])
+            self._pending_tag = None
+        else:
+            self._depth -= 1
+            self._write([self._line(f'</{tag}>', self._depth)])
+
+    def _write(self, lines: List[str]) -> None:
+        self._fp.write(''.join(lines).encode('utf8'))
+
+    def _render_key(self, name: str, depth: int, lines: List[str]) -> None:
+        if not isinstance(name, str):
+            raise TypeError('keys must be strings')
+        lines.append(self._line(f'<key>{self._escape(name)}</key>', depth))
+
+    def _render(self, value: Any, depth: int, lines: List[str]) -> None:
+        if isinstance(value, str):
+            lines.append(self._line(f'<string>{self._escape(value)}</string>', depth))
+        elif value is True:
+            lines.append(self._line('<true/>', depth))
+        elif value is False:
+            lines.append(self._line('<false/>', depth))
+        elif isinstance(value, int):
+            lines.append(self._line(f'<integer>{value:d}</integer>', depth))
+        elif isinstance(value, float):
+            lines.append(self._line(f'<real>{value!r}</real>', depth))
+        elif isinstance(value, dict):
+            if not value:
+                lines.append(self._line('<dict/>', depth))
+                return
+            lines.append(self._line('<dict>', depth))
+            for k, v in sorted(value.items()):
+                self._render_key(k, depth + 1, lines)
+                self._render(v, depth + 1, lines)
+            lines.append(self._line('</dict>', depth))
+        elif isinstance(value, (list, tuple)):
+            if not value:
+                lines.append(self._line('<array/>', depth))
+                return
+            lines.append(self._line('<array>', depth))
+            for v in value:
+                self._render(v, depth + 1, lines)
+            lines.append(self._line('</array>', depth))
+        else:
+            raise TypeError(f'unsupported type: {type(value)}')
+
+    @staticmethod
+    def _line(text: str, depth: int) -> str:
+        return '\t' * depth + text + '\n'
+
+    @staticmethod
+    def _escape(text: str) -> str:
+        if _control_chars.search(text):
+            raise ValueError('strings can\'t contain control characters')
+        text = text.replace('\r\n', '\n')
+        text = text.replace('\r', '\n')
+        text = text.replace('&', '&amp;')
+        text = text.replace('<', '&lt;')
+        text = text.replace('>', '&gt;')
+        return text
+
+
+class _PreparedXmlItems:
+    def __init__(self, items: Dict[str, Any]):
+        self.items = items
+        self.rendered: Dict[int, bytes] = {}
+
+
+class BinaryPlistWriter(PlistWriter):
+    """
+    Writes binary plist (bplist00) with container objects placed after their elements,
+    so each container can be written as soon as it's closed.
+    References are always 4 bytes long, as the number of objects is not known upfront.
+    """
+
+    _ref_size = 4
+
+    def __init__(self, fp: BinaryIO):
+        super().__init__(fp)
+        self._position = 0
+        self._offsets = array('Q')
+        # open containers, each as [key refs, value refs]; arrays have no key refs
+        self._containers: List[List[Union[array, None]]] = []
+        self._key_refs: Dict[str, int] = {}
+        self._top_ref = None
+
+        self._write(b'bplist00')
+
+    def start_dict(self) -> None:
+        self._containers.append([array('L'), array('L')])
+
+    def end_dict(self) -> None:
+        key_refs, value_refs = self._containers.pop()
+        self._add_ref(self._write_container(0xD0, len(key_refs), key_refs + value_refs))
+
+    def start_array(self) -> None:
+        self._containers.append([None, array('L')])
+
+    def end_array(self) -> None:
+        _, value_refs = self._containers.pop()
+        self._add_ref(self._write_container(0xA0, len(value_refs), value_refs))
+
+    def key(self, name: str) -> None:
+        self._containers[-1][0].append(self._write_key(name))
+
+    def value(self, value: Any) -> None:
+        self._add_ref(self._write_object(value))
+
+    def prepare(self, items: Dict[str, Any]) -> List[Tuple[int, int]]:
+        return [(self._write_key(k), self._write_object(v)) for k, v in items.items()]
+
+    def items(self, prepared: List[Tuple[int, int]]) -> None:
+        key_refs, value_refs = self._containers[-1]
+        for key_ref, value_ref in prepared:
+            key_refs.append(key_ref)
+            value_refs.append(value_ref)
+
+    def close(self) -> None:
+        table_offset = self._position
+        offset_size = self._int_size(table_offset)
+        offset_format = {1: 'B', 2: 'H', 4: 'L', 8: 'Q'}[offset_size]
+
+        self._write(struct.pack(f'>{len(self._offsets)}{offset_format}', *self._offsets))
+        self._write(struct.pack('>6xBBQQQ', offset_size, self._ref_size, len(self._offsets), self._top_ref,
+                                table_offset))
+
+    def _write(self, data: bytes) -> None:
+        self._fp.write(data)
+        self._position += len(data)
+
+    def _add_ref(self, ref: int) -> None:
+        if self._containers:
+            self._containers[-1][1].append(ref)
+        else:
+            self._top_ref = ref
+
+    def _new_object(self) -> int:
+        self._offsets.append(self._position)
+        return len(self._offsets) - 1
+
+    def _write_key(self, name: str) -> int:
+        if not isinstance(name, str):
+            raise TypeError('keys must be strings')
+        if name not in self._key_refs:
+            self._key_refs[name] = self._write_object(name)
+        return self._key_refs[name]
+
+    def _write_object(self, value: Any) -> int:
+        if isinstance(value, dict):
+            items = sorted(value.items())
+            key_refs = [self._write_key(k) for k, _ in items]
+            value_refs = [self._write_object(v) for _, v in items]
+            return self._write_container(0xD0, len(items), key_refs + value_refs)
+
+        if isinstance(value, (list, tuple)):
+            refs = [self._write_object(v) for v in value]
+            return self._write_container(0xA0, len(refs), refs)
+
+        ref = self._new_object()
+
+        if value is False:
+            self._write(b'\x08')
+        elif value is True:
+            self._write(b'\x09')
+        elif isinstance(value, int):
+            self._write(self._encode_int(value))
+        elif isinstance(value, float):
+            self._write(b'\x23' + struct.pack('>d', value))
+        elif isinstance(value, str):
+            try:
+                data = value.encode('ascii')
+                self._write(self._encode_count(0x50, len(data)) + data)
+            except UnicodeEncodeError:
+                data = value.encode('utf-16be')
+                self._write(self._encode_count(0x60, len(data) // 2) + data)
+        elif isinstance(value, (bytes, bytearray)):
+            self._write(self._encode_count(0x40, len(value)) + bytes(value))
+        else:
+            raise TypeError(f'unsupported type: {type(value)}')
+
+        return ref
+
+    def _write_container(self, token: int, count: int, refs) -> int:
+        ref = self._new_object()
+        self._write(self._encode_count(token, count))
+        self._write(struct.pack(f'>{len(refs)}L', *refs))
+        return ref
+
+    def _encode_count(self, token: int, count: int) -> bytes:
+        if count < 15:
+            return bytes([token | count])
+        return bytes([token | 0xF]) + self._encode_int(count)
+
+    @staticmethod
+    def _encode_int(value: int) -> bytes:
+        if value < 0:
+            return b'\x13' + struct.pack('>q', value)
+        if value < 1 << 8:
+            return b'\x10' + struct.pack('>B', value)
+        if value < 1 << 16:
+            return b'\x11' + struct.pack('>H', value)
+        if value < 1 << 32:
+            return b'\x12' + struct.pack('>L', value)
+        if value < 1 << 63:
+            return b'\x13' + struct.pack('>q', value)
+        return b'\x14' + value.to_bytes(16, 'big')
+
+    @staticmethod
+    def _int_size(value: int) -> int:
+        for size in [1, 2, 4]:
+            if value < 1 << (8 * size):
+                return size
+        return 8
+
+
+class PlistDictTemplate:
+    """
+    Dict with constant values prepared once and variable values provided on each write.
+    Entries are written in sorted keys order, like plistlib does.
+    Variable value can be a function writing it to the writer, to stream containers.
+    """
+
+    def __init__(self, writer: PlistWriter, constants: Dict[str, Any], variable_keys: List[str]):
+        self._writer = writer
+        self._segments = []
+
+        constants_segment = {}
+        for key in sorted(set(constants) | set(variable_keys)):
+            if key in variable_keys:
+                if constants_segment:
+                    self._segments.append(writer.prepare(constants_segment))
+                    constants_segment = {}
+                self._segments.append(key)
+            else:
+                constants_segment[key] = constants[key]
+        if constants_segment:
+            self._segments.append(writer.prepare(constants_segment))
+
+    def write(self, values: Dict[str, Any]) -> None:
+        self._writer.start_dict()
+        for segment in self._segments:
+            if isinstance(segment, str):
+                self._writer.key(segment)
+                value = values[segment]
+                if callable(value):
+                    value()
+                else:
+                    self._writer.value(value)
+            else:
+                self._writer.items(segment)
+        self._writer.end_dict()
+
+
+def create_plist_writer(fp: BinaryIO, fmt: plistlib.PlistFormat) -> PlistWriter:
+    return XmlPlistWriter(fp) if fmt == plistlib.FMT_XML else BinaryPlistWriter(fp)
@@ -1,9 +1,12 @@
+import json
 from abc import ABCMeta, abstractmethod
 from argparse import ArgumentParser
 from typing import Dict, Any, List
 
 from icons_asset_generator.arguments import default_name_remove
 from icons_asset_generator.common.images_finder import get_image_groups
+from icons_asset_generator.common.manifest import create_manifest_entry, save_manifest, load_manifest, \
+    plan_changes
 from icons_asset_generator.common.name import create_name
 from icons_asset_generator.util.io import create_output_dir
 from icons_asset_generator.util.logger import get_logger
@@ -21,6 +24,7 @@ class ProcessorConfig:
     vertex_magnets = None
     side_magnets = None
     labels = None
+    plan = None
 
     def __init__(self, dictionary):
         for k, v in dictionary.items():
@@ -31,6 +35,7 @@ class Processor(metaclass=ABCMeta):
     _conf: ProcessorConfig = None
 
     _libraries: Dict[str, List[str]] = {}
+    _manifest: List[Dict[str, Any]] = []
 
     def __init__(self, **kwargs):
         self._conf = self._create_config(kwargs)
@@ -56,14 +61,64 @@ class Processor(metaclass=ABCMeta):
     def process(self):
         self._create_dirs()
 
-        self._libraries = get_image_groups(self._conf.path, self._conf.filename_includes, self._conf.filename_excludes, self._conf.library_name_remove)
+        self._libraries = self._get_image_groups()
+        self._manifest = []
 
+        # writes all the artifacts, so the manifest is saved only for successful build
+        self._process_groups()
+
+        manifest_file = save_manifest(self._conf.output, self._manifest_target(), self._manifest_options(),
+                                      self._manifest)
+        logger.debug(f'Created {manifest_file}')
+
+    def plan(self) -> Dict[str, Any]:
+        libraries = self._get_image_groups()
+        manifest = load_manifest(self._conf.output)
+
+        if manifest is None:
+            logger.info('No manifest from previous build found')
+
+        changes = plan_changes(manifest, self._manifest_target(), self._manifest_options(), self._conf.path,
+                               libraries)
+
+        if changes['options_changed']:
+            logger.info('Options changed since previous build')
+        for source in changes['added']:
+            logger.info(f'Added: {source}')
+        for source in changes['changed']:
+            logger.info(f'Changed: {source}')
+        for source in changes['removed']:
+            logger.info(f'Removed: {source}')
+        logger.info(f'{len(changes["added"])} added, {len(changes["changed"])} changed, '
+                    f'{len(changes["removed"])} removed, {changes["unchanged"]} unchanged images')
+        logger.info(f'Estimated output size: {changes["estimated_size"]} bytes')
+
+        return changes
+
+    def _process_groups(self):
         for library_name, library_images in self._libraries.items():
             self.process_group(library_name, library_images)
 
+    def _get_image_groups(self) -> Dict[str, List[str]]:
+        return get_image_groups(self._conf.path, self._conf.filename_includes, self._conf.filename_excludes,
+                                self._conf.library_name_remove)
+
     def _create_dirs(self):
         create_output_dir(self._conf.output)
 
+    def _add_to_manifest(self, image: str, group: str, artifact: str, encoded_size: int):
+        self._manifest.append(
+            create_manifest_entry(self._conf.path, image, group, artifact, encoded_size)
+        )
+
+    def _manifest_target(self) -> str:
+        return type(self).__name__
+
+    def _manifest_options(self) -> Dict[str, Any]:
+        options = {k: v for k, v in vars(self._conf).items() if k not in ['path', 'output', 'plan', 'v']}
+        # normalize values like tuples to compare them with the ones loaded from JSON
+        return json.loads(json.dumps(options))
+
     @abstractmethod
     def process_group(self, library_name: str, library_images: List[str]):
         logger.info(f'Processing {len(library_images)} images from group "{library_name}"')
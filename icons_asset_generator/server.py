@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import stat
+import time
+from argparse import ArgumentParser
+from contextlib import redirect_stderr, redirect_stdout
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from icons_asset_generator.arguments import create_arg_parser
+from icons_asset_generator.common.invalid_argument import InvalidArgument
+from icons_asset_generator.diagramsnet.diagramsnet import DiagramsNet
+from icons_asset_generator.omnigraffle.omnigraffle import OmniGraffle, load_templates
+from icons_asset_generator.util.cache import render_cache, hash_cache
+from icons_asset_generator.util.logger import setup_logging, get_logger
+
+logger = get_logger(__name__)
+
+allowed_hosts = ['localhost', '127.0.0.1', '::1']
+
+
+def create_server_arg_parser() -> ArgumentParser:
+    parser = ArgumentParser(description='Run local service building icons assets with warm caches.')
+    parser.add_argument('--socket', metavar='PATH', default='./icons-asset-generator.sock',
+                        help='Unix socket path to listen on (default: ./icons-asset-generator.sock)')
+    parser.add_argument('--tcp', action='store_true',
+                        help='listen on host and port instead of Unix socket; requests are not authenticated')
+    parser.add_argument('--host', metavar='HOST', default='127.0.0.1',
+                        help='address to listen on with --tcp (default: 127.0.0.1)')
+    parser.add_argument('--port', metavar='PORT', default=8765, type=int,
+                        help='port to listen on with --tcp (default: 8765)')
+    parser.add_argument('--cache-size', metavar='COUNT', default=10000, type=int,
+                        help='max number of encoded and rendered icons kept in memory, '
+                             'and separately of icons content hashes (default: 10000)')
+    parser.add_argument('-v', action='store_true', help='enable verbose logs')
+    return parser
+
+
+def run_job(job_args: List[str]) -> Tuple[int, Dict[str, Any]]:
+    """
+    Runs a build with the same arguments as accepted by the command line interface.
+    :return: HTTP status code and response body
+    """
+    parser = create_arg_parser([
+        DiagramsNet,
+        OmniGraffle,
+    ])
+
+    messages = StringIO()
+    try:
+        with redirect_stdout(messages), redirect_stderr(messages):
+            args = vars(parser.parse_args(job_args))
+    except SystemExit:
+        return 400, {'error': messages.getvalue().strip()}
+
+    args.pop('v')
+
+    start = time.perf_counter()
+    try:
+        processor = args.pop('processor')(**args)
+        if args.get('plan'):
+            body = {'plan': processor.plan()}
+        else:
+            processor.process()
+            body = {}
+    except InvalidArgument as e:
+        return 400, {'error': str(e)}
+    except Exception as e:
+        logger.exception('Build failed')
+        return 500, {'error': str(e)}
+
+    body['duration'] = round(time.perf_counter() - start, 3)
+    return 200, body
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """
+    Accepts build jobs as POST requests with JSON body: {"args": ["--path", "...", "omnigraffle"]}
+    Requests are not authenticated. As builds remove the output directory, requests which could come
+    from a web browser (with Origin header, non-local Host, or other content type than JSON) are rejected.
+    """
+
+    def do_POST(self):
+        error = self._validate_headers()
+        if error:
+            self._respond(*error)
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            job_args = json.loads(self.rfile.read(length))['args']
+            if not isinstance(job_args, list):
+                raise ValueError('args must be a list')
+        except (ValueError, KeyError, TypeError) as e:
+            self._respond(400, {'error': f'Invalid request: {e}'})
+            return
+
+        status, body = run_job([str(arg) for arg in job_args])
+        self._respond(status, body)
+
+    def _validate_headers(self) -> Optional[Tuple[int, Dict[str, Any]]]:
+        if 'Origin' in self.headers:
+            return 403, {'error': 'Cross-origin requests are not allowed'}
+
+        host = urlsplit('//' + self.headers.get('Host', '')).hostname
+        if host not in allowed_hosts:
+            return 403, {'error': 'Host must be one of: ' + ', '.join(allowed_hosts)}
+
+        if self.headers.get_content_type() != 'application/json':
+            return 415, {'error': 'Content-Type must be application/json'}
+
+        return None
+
+    def _respond(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode('utf8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return str(self.client_address[0]) if self.client_address else 'local'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+
+class UnixHTTPServer(socketserver.UnixStreamServer):
+    socket_id: Tuple[int, int] = None
+
+    def server_bind(self):
+        super().server_bind()
+        # to remove only own socket on close, if another server took over the path meanwhile
+        self.socket_id = _file_id(self.server_address)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.lexists(self.server_address) and _file_id(self.server_address) == self.socket_id:
+            os.remove(self.server_address)
+
+
+def create_server(tcp: bool, host: str, port: int, socket_path: str) -> socketserver.BaseServer:
+    if tcp:
+        return HTTPServer((host, port), JobRequestHandler)
+
+    if os.path.lexists(socket_path):
+        if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+            raise InvalidArgument(f'Socket path {socket_path} exists and is not a socket')
+        if _is_socket_in_use(socket_path):
+            raise InvalidArgument(f'Socket path {socket_path} is already in use')
+        # left by a previous run
+        os.remove(socket_path)
+    return UnixHTTPServer(socket_path, JobRequestHandler)
+
+
+def _is_socket_in_use(socket_path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except ConnectionRefusedError:
+            return False
+    return True
+
+
+def _file_id(path: str) -> Tuple[int, int]:
+    file_stat = os.lstat(path)
+    return file_stat.st_dev, file_stat.st_ino
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    args = create_server_arg_parser().parse_args()
+
+    setup_logging(level=logging.DEBUG if args.v else logging.INFO)
+
+    render_cache.resize(args.cache_size)
+    hash_cache.resize(args.cache_size)
+    load_templates()
+
+    try:
+        server = create_server(args.tcp, args.host, args.port, args.socket)
+    except InvalidArgument as e:
+        logger.error(str(e))
+        exit(1)
+
+    # stop on SIGTERM the same way as on Ctrl+C, to remove the socket on close
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+
+    if args.tcp:
+        logger.warning('Requests to the service are not authenticated')
+    logger.info(f'Listening on {f"{args.host}:{args.port}" if args.tcp else args.socket}')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
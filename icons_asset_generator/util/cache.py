@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Least recently used cache with a limit on the number of entries.
+    Cache with size 0 (the default) does not store anything.
+    """
+
+    def __init__(self, max_size: int = 0):
+        self._max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if key not in self._entries:
+            return None
+
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self._max_size <= 0:
+            return
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def resize(self, max_size: int) -> None:
+        self._max_size = max_size
+        self._evict()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _evict(self) -> None:
+        while len(self._entries) > max(self._max_size, 0):
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Encoded and rendered icons, shared between builds run in the same process (see server.py)
+render_cache = LRUCache()
+
+# Content hashes of icons, kept separately as they are much smaller than rendered icons
+hash_cache = LRUCache()
@@ -1,7 +1,16 @@
 import os
 import shutil
+from typing import Tuple
 
 
 def create_output_dir(dir_name) -> None:
     shutil.rmtree(dir_name, ignore_errors=True)
     os.mkdir(dir_name)
+
+
+def file_key(file_path: str) -> Tuple[str, int, int]:
+    """
+    :return: Key identifying file content by its path, modification time and size, without reading it
+    """
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,82 @@
+import glob
+import os
+import plistlib
+import tempfile
+import unittest
+from typing import List
+from unittest.mock import patch
+
+from icons_asset_generator.arguments import create_arg_parser
+from icons_asset_generator.omnigraffle.omnigraffle import OmniGraffle
+
+rendered_image = (b'%PDF-1.4 stub', (48, 32))
+
+
+class OmniGraffleTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._images_path = os.path.join(self._tmp_dir.name, 'icons')
+        self._output_path = os.path.join(self._tmp_dir.name, 'library')
+
+        for group, count in [('A', 7), ('B', 2)]:
+            os.makedirs(os.path.join(self._images_path, group))
+            for idx in range(1, count + 1):
+                with open(os.path.join(self._images_path, group, f'icon{idx}.svg'), 'w') as fp:
+                    fp.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{idx}" height="{idx}"/>')
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_data_plist_lists_all_images_in_split_sheets(self):
+        for text_output in [False, True]:
+            with self.subTest(text_output=text_output):
+                args = ['--max-sheet-icons', '3'] + (['--text-output'] if text_output else [])
+                with patch.object(OmniGraffle, '_render_image', return_value=rendered_image):
+                    self._create_processor(args).process()
+
+                with open(os.path.join(self._stencil_path(), 'data.plist'), 'rb') as fp:
+                    data = plistlib.load(fp)
+
+                self.assertEqual(['A 1', 'A 2', 'A 3', 'B'], [sheet['SheetTitle'] for sheet in data['Sheets']])
+                self.assertEqual([3, 3, 1, 2], [len(sheet['GraphicsList']) for sheet in data['Sheets']])
+
+                image_ids = [image['ID'] for sheet in data['Sheets'] for image in sheet['GraphicsList']]
+                self.assertEqual(list(range(1, 10)), image_ids)
+                self.assertEqual([f'image{idx}.pdf' for idx in image_ids], data['ImageList'])
+                self.assertEqual(10, data['ImageCounter'])
+
+                for image_file in data['ImageList']:
+                    self.assertTrue(os.path.isfile(os.path.join(self._stencil_path(), image_file)))
+
+    def test_no_data_plist_when_rendering_fails(self):
+        render_results = [rendered_image] * 4 + [Exception('Rendering failed')]
+
+        with patch.object(OmniGraffle, '_render_image', side_effect=render_results):
+            with self.assertRaisesRegex(Exception, 'Rendering failed'):
+                self._create_processor([]).process()
+
+        self.assertEqual([], self._data_files())
+
+    def test_no_data_plist_when_processed_images_do_not_match_image_list(self):
+        with patch.object(OmniGraffle, 'process_group'):
+            with self.assertRaisesRegex(Exception, 'do not match ImageList'):
+                self._create_processor([]).process()
+
+        self.assertEqual([], self._data_files())
+
+    def _create_processor(self, omnigraffle_args: List[str]) -> OmniGraffle:
+        parser = create_arg_parser([OmniGraffle])
+        args = vars(parser.parse_args(['--path', self._images_path, '--output', self._output_path, 'omnigraffle']
+                                      + omnigraffle_args))
+        return args.pop('processor')(**args)
+
+    def _stencil_path(self) -> str:
+        return os.path.join(self._output_path, 'icons.gstencil')
+
+    def _data_files(self) -> List[str]:
+        return glob.glob(os.path.join(self._stencil_path(), 'data.plist*'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import plistlib
+import unittest
+from io import BytesIO
+from typing import Any, Dict
+
+from icons_asset_generator.omnigraffle.plist_writer import create_plist_writer, PlistDictTemplate, PlistWriter
+
+image_constants = {
+    'Class': 'ShapedGraphic',
+    'Magnets': ['{-1, -1}', '{1, -1}', '{1, 1}', '{-1, 1}'],
+    'Style': {'fill': {'Draws': 'NO'}, 'stroke': {'Draws': 'NO'}},
+}
+
+
+def create_image(idx: int) -> Dict[str, Any]:
+    return {
+        'Bounds': f'{{{{{idx * 50}, 0}},{{48, 48}}}}',
+        'ID': idx,
+        'Name': f'Ikona żółw & <{idx}>',
+    }
+
+
+def create_data(images_count: int) -> Dict[str, Any]:
+    return {
+        'ApplicationVersion': ['com.omnigroup.OmniGraffle7', '201.7.0'],
+        'Empty': {},
+        'Flags': [True, False],
+        'Numbers': [0, 255, 256, 65536, 1 << 32, -1, 0.5, 100.0],
+        'Sheets': [{
+            'GraphicsList': [dict(image_constants, **create_image(idx)) for idx in range(1, images_count + 1)],
+            'Layers': [],
+            'SheetTitle': 'Group',
+        }],
+    }
+
+
+def write_data(writer: PlistWriter, images_count: int) -> None:
+    data = create_data(images_count)
+    data_tpl = PlistDictTemplate(writer, data, ['Sheets'])
+    sheet_tpl = PlistDictTemplate(writer, data['Sheets'][0], ['GraphicsList', 'SheetTitle'])
+    image_tpl = PlistDictTemplate(writer, image_constants, ['Bounds', 'ID', 'Name'])
+
+    def write_images():
+        writer.start_array()
+        for idx in range(1, images_count + 1):
+            image_tpl.write(create_image(idx))
+        writer.end_array()
+
+    def write_sheets():
+        writer.start_array()
+        sheet_tpl.write({'GraphicsList': write_images, 'SheetTitle': 'Group'})
+        writer.end_array()
+
+    data_tpl.write({'Sheets': write_sheets})
+    writer.close()
+
+
+class PlistWriterTest(unittest.TestCase):
+
+    def test_xml_output_is_same_as_plistlib(self):
+        for images_count in [0, 1, 701]:
+            with self.subTest(images_count=images_count):
+                fp = BytesIO()
+                write_data(create_plist_writer(fp, plistlib.FMT_XML), images_count)
+
+                expected = plistlib.dumps(create_data(images_count), fmt=plistlib.FMT_XML)
+                self.assertEqual(expected, fp.getvalue())
+
+    def test_binary_output_is_read_by_plistlib(self):
+        for images_count in [0, 1, 701]:
+            with self.subTest(images_count=images_count):
+                fp = BytesIO()
+                write_data(create_plist_writer(fp, plistlib.FMT_BINARY), images_count)
+
+                expected = plistlib.loads(plistlib.dumps(create_data(images_count), fmt=plistlib.FMT_BINARY))
+                self.assertEqual(expected, plistlib.loads(fp.getvalue()))
+
+    def test_xml_rejects_control_characters(self):
+        writer = create_plist_writer(BytesIO(), plistlib.FMT_XML)
+        with self.assertRaises(ValueError):
+            writer.value('\f')
+
+
+if __name__ == '__main__':
+    unittest.main()